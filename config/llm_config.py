@@ -13,21 +13,17 @@
 # limitations under the License.
 
 from dataclasses import dataclass
-from typing import List
+from typing import Tuple
 
-@dataclass
+@dataclass(frozen=True)
 class LLMConfig:
-    available_models: List[str] = None
+    available_models: Tuple[str, ...] = (
+        "gemini-2.0-flash-001",
+        "gemini-1.5-pro-002",
+        "gemini-1.5-flash-002",
+    )
     default_temperature: float = 0.2
     default_max_tokens: int = 8192
     default_top_p: float = 0.95
-    
-    def __post_init__(self):
-        if self.available_models is None:
-            self.available_models = [
-                "gemini-2.0-flash-001",
-                "gemini-1.5-pro-002",
-                "gemini-1.5-flash-002"
-            ]
 
-llm_config = LLMConfig() 
\ No newline at end of file
+llm_config = LLMConfig()
\ No newline at end of file
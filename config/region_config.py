@@ -12,7 +12,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from typing import List
+from typing import List, Optional
 
 AVAILABLE_REGIONS: List[str] = [
     "us-central1",
@@ -21,4 +21,28 @@ AVAILABLE_REGIONS: List[str] = [
     "asia-northeast1",
     "australia-southeast1",
     "asia-south1"
-] 
\ No newline at end of file
+]
+
+# Seconds a region that just failed is moved to the end of the failover order
+REGION_COOLDOWN_SECONDS: float = 60.0
+
+# Number of regions queried at the same time; the first answer wins.
+# Values above 1 multiply Vertex AI requests, so this is off by default.
+CONCURRENT_REGIONS: int = 1
+
+# Seconds to wait for an answer before also sending the request to the next
+# region. Set well above a typical conversion so only hung or unusually slow
+# requests are hedged; None disables hedging.
+HEDGE_DELAY_SECONDS: Optional[float] = 30.0
+
+# Seconds after which a region that has not answered counts as failed, so a
+# hung request cannot stall a conversion indefinitely. Streamed requests only
+# wait this long for their first chunk. Allows for long generations near the
+# token limit; None waits forever.
+REGION_TIMEOUT_SECONDS: Optional[float] = 180.0
+
+# Regions are tried in order of an exponential moving average of their
+# response latency; each consecutive failure adds a penalty to that score.
+# Regions not measured yet score the average of the measured ones.
+REGION_LATENCY_EMA_ALPHA: float = 0.2
+REGION_FAILURE_PENALTY_SECONDS: float = 30.0
@@ -54,4 +54,19 @@ LLM_CONTROL_CONFIGS = {
         "step": 0.05,
         "help": "Nucleus sampling threshold"
     }
-} 
\ No newline at end of file
+}
+
+# LLM_CONTROL_CONFIGS flattened for the sidebar:
+# (name, label, min_value, max_value, default_value, step, help)
+SLIDER_SPECS = tuple(
+    (
+        name,
+        name.replace('_', ' ').title(),
+        config["min_value"],
+        config["max_value"],
+        config["default_value"],
+        config["step"],
+        config["help"],
+    )
+    for name, config in LLM_CONTROL_CONFIGS.items()
+)
@@ -13,10 +13,18 @@
 # limitations under the License.
 
 import os
+import hashlib
+import io
+import pickle
+import re
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 import yaml
 import streamlit as st
-from typing import Union, List, Any
+from typing import Union, List, Any, Callable, Dict, Tuple, IO, Iterator, Optional
 import logging
+from collections.abc import Mapping
 import vertexai
 from vertexai.generative_models import (
     GenerationConfig,
@@ -25,38 +33,166 @@ from vertexai.generative_models import (
     Part,
 )
 import vertexai.generative_models as generative_models
-from tenacity import retry, stop_after_attempt, wait_exponential
+from google.api_core import exceptions as api_exceptions
 from dotenv import load_dotenv
 
 from config.llm_config import llm_config
 from config.safety_config import SAFETY_SETTINGS
-from config.region_config import AVAILABLE_REGIONS
-from config.ui_config import SIDEBAR_CONTENT, LLM_CONTROL_CONFIGS
+from config.region_config import (
+    AVAILABLE_REGIONS,
+    CONCURRENT_REGIONS,
+    HEDGE_DELAY_SECONDS,
+    REGION_COOLDOWN_SECONDS,
+    REGION_FAILURE_PENALTY_SECONDS,
+    REGION_LATENCY_EMA_ALPHA,
+    REGION_TIMEOUT_SECONDS,
+)
+from config.ui_config import SIDEBAR_CONTENT, SLIDER_SPECS
+from utils.llm_cache import LLMCache, conversion_cache, llm_cache
+from utils.yaml_utils import SafeLoader, SafeDumper
+
+_LOGGER = logging.getLogger(__name__)
+
+RETRY_ATTEMPTS = 3
+RETRY_MAX_WAIT_SECONDS = 10
+
+# Transient errors worth retrying; anything else (auth, invalid requests,
+# programming errors) fails the same way on every attempt
+RETRYABLE_ERRORS = (
+    api_exceptions.ServiceUnavailable,
+    api_exceptions.ResourceExhausted,
+    api_exceptions.DeadlineExceeded,
+    api_exceptions.InternalServerError,
+)
+
+class AllRegionsFailedError(Exception):
+    """Raised when no region answered; errors holds each region's failure in order."""
+
+    def __init__(self, errors: List[Exception]):
+        self.errors = errors
+        last_error = errors[-1] if errors else None
+        super().__init__(f"All regions failed. Last error: {str(last_error)}")
+
+def _response_texts(responses: Iterator[Any]) -> Iterator[str]:
+    """Yield the text of each streamed response chunk."""
+    for response in responses:
+        try:
+            yield response.text
+        except ValueError:
+            # Chunks without text, e.g. the final finish-reason chunk
+            continue
+
+class RegionModelCache:
+    """GenerativeModel instances keyed by (project, region, model name).
+
+    A model binds the project and location from the global vertexai config
+    when constructed, so one instance per key can be reused across calls,
+    clients and threads.
+    """
+
+    def __init__(self):
+        self._models: Dict[Tuple[str, str, str], GenerativeModel] = {}
+        # vertexai.init is process-global, so init + construction must not
+        # interleave between threads
+        self._lock = threading.Lock()
+
+    def get(self, project_id: str, region: str, model_name: str) -> GenerativeModel:
+        key = (project_id, region, model_name)
+        model = self._models.get(key)
+        if model is None:
+            with self._lock:
+                model = self._models.get(key)
+                if model is None:
+                    vertexai.init(project=project_id, location=region)
+                    model = GenerativeModel(model_name)
+                    self._models[key] = model
+        return model
+
+    def discard(self, project_id: str, region: str, model_name: str) -> None:
+        self._models.pop((project_id, region, model_name), None)
+
+class RegionHealth:
+    """Failover state used to rank regions, shareable across clients and threads.
+
+    Regions are ranked by an exponential moving average of their response
+    latency plus a penalty per consecutive failure, and regions that just
+    failed are demoted until their cooldown expires. Full responses and
+    time to first streamed chunk are averaged apart, as they differ by an
+    order of magnitude.
+    """
+
+    def __init__(self):
+        self._latency: Dict[bool, Dict[str, float]] = {False: {}, True: {}}
+        self._failures: Dict[str, int] = {}
+        self._cooldowns: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def ordered(self, regions: List[str], streaming: bool = False) -> List[str]:
+        now = time.monotonic()
+        with self._lock:
+            latencies = dict(self._latency[streaming])
+            failures = dict(self._failures)
+            cooldowns = dict(self._cooldowns)
+        # Regions without a sample yet score the average of the measured
+        # ones, so a measured region that keeps failing drops behind them
+        # while a healthy one keeps its place
+        prior = sum(latencies.values()) / len(latencies) if latencies else 0.0
+
+        def rank(region: str) -> Tuple[bool, float, bool]:
+            latency = latencies.get(region, prior)
+            penalty = REGION_FAILURE_PENALTY_SECONDS * failures.get(region, 0)
+            return cooldowns.get(region, 0.0) > now, latency + penalty, region not in latencies
+
+        return sorted(regions, key=rank)
+
+    def mark_ok(self, region: str, latency: float, streaming: bool = False) -> None:
+        with self._lock:
+            latencies = self._latency[streaming]
+            previous = latencies.get(region)
+            latencies[region] = latency if previous is None else (
+                REGION_LATENCY_EMA_ALPHA * latency + (1 - REGION_LATENCY_EMA_ALPHA) * previous
+            )
+            self._failures.pop(region, None)
+            self._cooldowns.pop(region, None)
+
+    def mark_failed(self, region: str) -> None:
+        with self._lock:
+            self._cooldowns[region] = time.monotonic() + REGION_COOLDOWN_SECONDS
+            self._failures[region] = self._failures.get(region, 0) + 1
 
 class GeminiRegionClient:
-    def __init__(self, project_id: str = None, logger: logging.Logger = None):
+    def __init__(self, project_id: str = None, logger: logging.Logger = None,
+                 model_cache: Optional[RegionModelCache] = None,
+                 region_health: Optional[RegionHealth] = None):
         self.project_id = project_id or os.environ.get("GCP_PROJECT")
         if not self.project_id:
             raise ValueError("Project ID must be provided or set in GCP_PROJECT environment variable")
             
-        self.logger = logger or logging.getLogger(__name__)
+        self.logger = logger or _LOGGER
         self.regions = AVAILABLE_REGIONS
         self.safety_settings = SAFETY_SETTINGS
         
-        self.default_generation_config = GenerationConfig(
-            max_output_tokens=llm_config.default_max_tokens,
+        self._generation_params = None
+        self.update_generation_config(
             temperature=llm_config.default_temperature,
+            max_output_tokens=llm_config.default_max_tokens,
             top_p=llm_config.default_top_p,
         )
         
         self.available_models = llm_config.available_models
         self.model_name = self.available_models[0]  # Default to first model
-
-    def _initialize_region(self, region: str) -> None:
-        vertexai.init(project=self.project_id, location=region)
         
-    def _get_model(self) -> GenerativeModel:
-        return GenerativeModel(self.model_name)
+        self._model_cache = model_cache or RegionModelCache()
+        self._region_health = region_health or RegionHealth()
+        
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+
+    def _get_model(self, region: str, model_name: str) -> GenerativeModel:
+        return self._model_cache.get(self.project_id, region, model_name)
+
+    def _ordered_regions(self, streaming: bool = False) -> List[str]:
+        return self._region_health.ordered(self.regions, streaming)
 
     def set_model(self, model_name: str) -> None:
         if model_name not in self.available_models:
@@ -64,100 +200,440 @@ class GeminiRegionClient:
         self.model_name = model_name
         
     def update_generation_config(self, temperature: float, max_output_tokens: int, top_p: float) -> None:
+        params = (temperature, max_output_tokens, top_p)
+        if params == self._generation_params:
+            return
+        self._generation_params = params
         self.default_generation_config = GenerationConfig(
             max_output_tokens=max_output_tokens,
             temperature=temperature,
             top_p=top_p,
         )
 
-    @retry(wait=wait_exponential(multiplier=1, min=2, max=10), stop=stop_after_attempt(3))
-    def generate_content(self, prompt: Union[str, List[Union[str, Part]]], **kwargs) -> str:
-        last_error = None
+    def _mark_region_ok(self, region: str, latency: float, streaming: bool = False) -> None:
+        self._region_health.mark_ok(region, latency, streaming)
+
+    def _mark_region_failed(self, region: str, model_name: str, error: Exception) -> None:
+        self.logger.warning("Error with region %s: %s", region, error)
+        self._region_health.mark_failed(region)
+        # Drop the cached model so a broken region is rebuilt on retry
+        self._model_cache.discard(self.project_id, region, model_name)
+
+    def _generate_in_region(self, region: str, model_name: str, prompt: Union[str, List[Union[str, Part]]],
+                            generation_config: GenerationConfig, **kwargs) -> str:
+        try:
+            model = self._get_model(region, model_name)
+            
+            started = time.monotonic()
+            response = model.generate_content(
+                prompt,
+                generation_config=generation_config,
+                safety_settings=self.safety_settings,
+                **kwargs
+            )
+            
+            self._mark_region_ok(region, time.monotonic() - started)
+            return response.text
+            
+        except Exception as e:
+            self._mark_region_failed(region, model_name, e)
+            raise
+
+    def _open_stream_in_region(self, region: str, model_name: str, prompt: Union[str, List[Union[str, Part]]],
+                               generation_config: GenerationConfig,
+                               **kwargs) -> Tuple[str, str, Iterator[Any]]:
+        """Start streaming from a region and wait for its first text chunk.
+
+        Returns the region, the first chunk's text and the rest of the stream.
+        """
+        try:
+            model = self._get_model(region, model_name)
+            
+            started = time.monotonic()
+            responses = iter(model.generate_content(
+                prompt,
+                generation_config=generation_config,
+                safety_settings=self.safety_settings,
+                stream=True,
+                **kwargs
+            ))
+            # Rank streaming regions by time to first token; the rest depends
+            # on how fast the caller consumes chunks
+            first_text = next(_response_texts(responses), None)
+            if first_text is None:
+                # A blocked or empty stream is a failure, as response.text
+                # would raise for it on a blocking call
+                raise ValueError(f"Region {region} returned no text; the response may have been blocked")
+            
+            self._mark_region_ok(region, time.monotonic() - started, streaming=True)
+            return region, first_text, responses
+            
+        except Exception as e:
+            self._mark_region_failed(region, model_name, e)
+            raise
+
+    def _generate_hedged(self, regions: List[str], call: Callable[..., Any], model_name: str,
+                         prompt: Union[str, List[Union[str, Part]]],
+                         generation_config: GenerationConfig, **kwargs) -> Any:
+        """Run call(region, model_name, ...) on regions in order and return the first success.
+
+        CONCURRENT_REGIONS requests start at once. Another region is started
+        whenever one fails, or when nothing has answered for
+        HEDGE_DELAY_SECONDS, so a hung region does not hold up the request.
+        A region that has not answered after REGION_TIMEOUT_SECONDS counts
+        as failed.
+        """
+        if self._executor is None:
+            # Background evaluations can reach here alongside the UI thread
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=len(self.regions), thread_name_prefix="gemini-region"
+                    )
+        remaining = list(regions)
+        started: Dict[Future, Tuple[str, float]] = {}
+        pending = set()
+        # Every region's failure, so retries can tell a transient outage
+        # from an error that will repeat
+        errors: List[Exception] = []
+
+        def start_next_region():
+            region = remaining.pop(0)
+            future = self._executor.submit(call, region, model_name, prompt, generation_config, **kwargs)
+            started[future] = (region, time.monotonic())
+            pending.add(future)
+
+        for _ in range(min(max(CONCURRENT_REGIONS, 1), len(remaining))):
+            start_next_region()
+        while pending:
+            timeouts = []
+            if remaining and HEDGE_DELAY_SECONDS is not None:
+                timeouts.append(HEDGE_DELAY_SECONDS)
+            if REGION_TIMEOUT_SECONDS is not None:
+                first_deadline = min(started[f][1] for f in pending) + REGION_TIMEOUT_SECONDS
+                timeouts.append(max(0.0, first_deadline - time.monotonic()))
+            done, _ = wait(
+                pending,
+                timeout=min(timeouts) if timeouts else None,
+                return_when=FIRST_COMPLETED,
+            )
+            if not done:
+                expired = []
+                if REGION_TIMEOUT_SECONDS is not None:
+                    now = time.monotonic()
+                    expired = [f for f in pending if now - started[f][1] >= REGION_TIMEOUT_SECONDS]
+                for future in expired:
+                    # The request keeps running in its thread, but is no longer waited on
+                    pending.discard(future)
+                    future.cancel()
+                    region = started[future][0]
+                    error = api_exceptions.DeadlineExceeded(
+                        f"Region {region} did not answer within {REGION_TIMEOUT_SECONDS}s"
+                    )
+                    errors.append(error)
+                    self._mark_region_failed(region, model_name, error)
+                # Either a region timed out or the hedge delay passed
+                for _ in range(max(len(expired), 1)):
+                    if remaining:
+                        start_next_region()
+                continue
+            for future in done:
+                pending.discard(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    errors.append(e)
+                    if remaining:
+                        start_next_region()
+                    continue
+                # Slower regions are left to finish in the background
+                for other in pending:
+                    other.cancel()
+                return result
+        
+        raise AllRegionsFailedError(errors) from (errors[-1] if errors else None)
+
+    def _generate_across_regions(self, prompt: Union[str, List[Union[str, Part]]], model_name: str,
+                                 streaming: bool = False, **kwargs) -> Any:
+        gen_config = kwargs.pop('generation_config', self.default_generation_config)
+        call = self._open_stream_in_region if streaming else self._generate_in_region
+        return self._generate_hedged(
+            self._ordered_regions(streaming), call, model_name, prompt, gen_config, **kwargs
+        )
+
+    def _response_cache_key(self, prompt: Union[str, List[Union[str, Part]]], model_name: str,
+                            **kwargs) -> Optional[str]:
+        """Return the response cache key, or None if the request must not be cached."""
+        # Only plain text prompts with deterministic sampling are cached
+        if not isinstance(prompt, str) or set(kwargs) - {'generation_config'}:
+            return None
+        gen_config = kwargs.get('generation_config', self.default_generation_config).to_dict()
+        if gen_config.get('temperature') != 0:
+            return None
+        return LLMCache.make_key(model=model_name, prompt=prompt, generation_config=gen_config)
+
+    def generate_content(self, prompt: Union[str, List[Union[str, Part]]],
+                         model_name: Optional[str] = None, **kwargs) -> str:
+        """Generate a response, with model_name defaulting to the selected model."""
+        model_name = model_name or self.model_name
+        cache_key = self._response_cache_key(prompt, model_name, **kwargs)
+        if cache_key is not None:
+            cached = llm_cache.get(cache_key)
+            if cached is not None:
+                return cached
         
-        for region in self.regions:
-            try:
-                self._initialize_region(region)
-                model = self._get_model()
-                
-                gen_config = kwargs.pop('generation_config', self.default_generation_config)
-                
-                response = model.generate_content(
-                    prompt,
-                    generation_config=gen_config,
-                    safety_settings=self.safety_settings,
-                    **kwargs
-                )
-                
-                return response.text
-                
-            except Exception as e:
-                self.logger.warning(f"Error with region {region}: {str(e)}")
-                last_error = e
+        response_text = self._generate_with_retries(prompt, model_name, **kwargs)
+        if cache_key is not None:
+            llm_cache.set(cache_key, response_text)
+        return response_text
+
+    def generate_content_stream(self, prompt: Union[str, List[Union[str, Part]]],
+                                model_name: Optional[str] = None, **kwargs) -> Iterator[str]:
+        """Yield the response text as Gemini streams it.
+
+        Until the first chunk arrives the request fails over, hedges, times
+        out and retries like generate_content; an error after that is
+        raised, since the partial output has already been consumed.
+        """
+        model_name = model_name or self.model_name
+        cache_key = self._response_cache_key(prompt, model_name, **kwargs)
+        if cache_key is not None:
+            cached = llm_cache.get(cache_key)
+            if cached is not None:
+                yield cached
+                return
         
-        raise Exception(f"All regions failed. Last error: {str(last_error)}") from last_error
-
-def load_yaral_examples():
-    """Load example YARAL rules from the examples directory."""
-    examples = {}
-    examples_dir = "examples"
-    for filename in os.listdir(examples_dir):
-        if filename.endswith(".yaral") and filename.startswith("rule"):
+        region, first_text, responses = self._generate_with_retries(
+            prompt, model_name, streaming=True, **kwargs
+        )
+        chunks = [first_text]
+        yield first_text
+        try:
+            for text in _response_texts(responses):
+                chunks.append(text)
+                yield text
+        except Exception as e:
+            self._mark_region_failed(region, model_name, e)
+            raise
+        
+        if cache_key is not None:
+            llm_cache.set(cache_key, "".join(chunks))
+
+    def _generate_with_retries(self, prompt: Union[str, List[Union[str, Part]]], model_name: str,
+                               streaming: bool = False, **kwargs) -> Any:
+        for attempt in range(RETRY_ATTEMPTS):
             try:
-                with open(os.path.join(examples_dir, filename), 'r') as f:
-                    examples[filename] = f.read()
+                return self._generate_across_regions(prompt, model_name, streaming, **kwargs)
             except Exception as e:
-                st.error(f"Error loading {filename}: {str(e)}")
-                continue
-    return examples
+                # Retry if any region failed transiently; the last region
+                # tried depends on the latency ranking
+                retryable = isinstance(e, AllRegionsFailedError) and any(
+                    isinstance(error, RETRYABLE_ERRORS) for error in e.errors
+                )
+                if not retryable or attempt == RETRY_ATTEMPTS - 1:
+                    raise
+                delay = min(RETRY_MAX_WAIT_SECONDS, 2 * 2 ** attempt)
+                self.logger.warning("Attempt %d failed, retrying in %ss: %s", attempt + 1, delay, e)
+                time.sleep(delay)
+
+EXAMPLES_DIR = "examples"
+EXAMPLES_INDEX_PATH = os.path.join(EXAMPLES_DIR, ".cache.pkl")
+# Bump when the layout of the pickled index changes
+EXAMPLES_INDEX_VERSION = 3
+
+@st.cache_resource
+def _parse_cache() -> Dict[str, Tuple[int, int, Any]]:
+    """Parsed example files keyed by path, reused while (st_mtime_ns, st_size) is unchanged."""
+    # Held in st.cache_resource because Streamlit re-executes this module on every rerun
+    return {}
+
+def _read_example(path: str, stat: os.stat_result, parse: Callable[[IO[bytes]], Any]) -> Any:
+    """Parse an example file, skipping the work if it has not changed since the last load."""
+    parse_cache = _parse_cache()
+    cached = parse_cache.get(path)
+    if cached is not None and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+        return cached[2]
+    with open(path, 'rb') as f:
+        value = parse(f)
+    parse_cache[path] = (stat.st_mtime_ns, stat.st_size, value)
+    return value
+
+class LazyExamples(Mapping):
+    """Example YARAL rules by filename, read from disk only when accessed."""
+
+    def __init__(self, paths: Dict[str, str]):
+        self._paths = paths
+
+    def __getitem__(self, filename: str) -> str:
+        path = self._paths[filename]
+        try:
+            return _read_example(path, os.stat(path), lambda f: f.read().decode('utf-8'))
+        except Exception as e:
+            st.error(f"Error loading {filename}: {str(e)}")
+            return ""
+
+    def __iter__(self):
+        return iter(self._paths)
+
+    def __len__(self) -> int:
+        return len(self._paths)
+
+def _parse_rule(f: IO[bytes]) -> Tuple[dict, str]:
+    """Parse a Sentinel rule and render it back to YAML once for display and prompts."""
+    rule = yaml.load(f, Loader=SafeLoader)
+    return rule, yaml.dump(rule, Dumper=SafeDumper, default_flow_style=False)
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def parse_uploaded_rule(data: bytes) -> Tuple[dict, str]:
+    """Parse an uploaded Sentinel rule, cached by content so reruns skip the parse and dump."""
+    return _parse_rule(io.BytesIO(data))
+
+def _is_example_file(name: str) -> bool:
+    return (name.endswith(".yaral") and name.startswith("rule")) or name.endswith(".yaml")
+
+def _examples_fingerprint(entries: List[os.DirEntry]) -> str:
+    """Hash the name, mtime and size of every example file, in name order."""
+    digest = hashlib.sha256(f"v{EXAMPLES_INDEX_VERSION}\n".encode())
+    for entry in entries:
+        stat = entry.stat()
+        digest.update(f"{entry.name}\0{stat.st_mtime_ns}\0{stat.st_size}\n".encode())
+    return digest.hexdigest()
+
+def _load_examples_index(fingerprint: str):
+    """Return the pickled examples if the on-disk index matches the fingerprint."""
+    try:
+        with open(EXAMPLES_INDEX_PATH, 'rb') as f:
+            if pickle.load(f) != fingerprint:
+                return None
+            return pickle.load(f)
+    except Exception:
+        return None
+
+def _save_examples_index(fingerprint: str, examples: Tuple[dict, dict]) -> None:
+    try:
+        with open(EXAMPLES_INDEX_PATH, 'wb') as f:
+            pickle.dump(fingerprint, f, protocol=5)
+            pickle.dump(examples, f, protocol=5)
+    except OSError as e:
+        _LOGGER.warning("Could not write examples index: %s", e)
+
+def _scan_examples() -> List[os.DirEntry]:
+    with os.scandir(EXAMPLES_DIR) as it:
+        return sorted(
+            (entry for entry in it if entry.is_file() and _is_example_file(entry.name)),
+            key=lambda e: e.name,
+        )
+
+def examples_fingerprint() -> str:
+    """Fingerprint of the current example files, used to key cached loads."""
+    return _examples_fingerprint(_scan_examples())
+
+# A cache resource hands every caller the same objects instead of an
+# unpickled copy per call, so callers must treat the result as read-only
+@st.cache_resource(show_spinner=False, max_entries=1)
+def _load_examples(fingerprint: str):
+    # Reuse the parsed examples from a previous process if nothing changed
+    cached = _load_examples_index(fingerprint)
+    if cached is not None:
+        return cached
+
+    entries = _scan_examples()
 
-def load_example_rules():
-    rules = {}
-    examples_dir = "examples"
-    for filename in os.listdir(examples_dir):
-        if filename.endswith(".yaml"):
+    # YARAL examples are only indexed by path here; LazyExamples reads them on use
+    yaral_paths = {}
+    example_rules = {}
+    complete = True
+    for entry in entries:
+        if entry.name.endswith(".yaral"):
+            yaral_paths[entry.name] = entry.path
+        else:
             try:
-                with open(os.path.join(examples_dir, filename), 'r') as f:
-                    rules[filename] = yaml.safe_load(f)
+                example_rules[entry.name] = _read_example(entry.path, entry.stat(), _parse_rule)
             except yaml.YAMLError as e:
-                st.error(f"Error loading {filename}: {str(e)}")
-                continue
-    return rules
+                st.error(f"Error loading {entry.name}: {str(e)}")
+                complete = False
+
+    # Only persist a full load so broken files are retried on the next start
+    if complete:
+        _save_examples_index(fingerprint, (yaral_paths, example_rules))
+    return yaral_paths, example_rules
+
+def load_all_examples() -> Tuple[str, LazyExamples, dict]:
+    """Scan the examples directory once for the fingerprint, YARAL examples and Sentinel rules."""
+    # Only the directory scan runs on every rerun; the load is cached per
+    # fingerprint, so editing an example invalidates it
+    fingerprint = examples_fingerprint()
+    yaral_paths, example_rules = _load_examples(fingerprint)
+    return fingerprint, LazyExamples(yaral_paths), example_rules
 
-def save_yaral_rule(yaral_content: str, filename: str) -> bool:
-    """Save the YARAL rule to a file in the output directory."""
+OUTPUT_DIR = 'output'
+
+def _write_yaral_rule(yaral_content: str, filename: str) -> str:
+    """Write the YARAL rule to the output directory and return its path."""
+    # Generate output filename
+    base_name = os.path.splitext(os.path.basename(filename))[0]
+    output_path = os.path.join(OUTPUT_DIR, f"{base_name}_converted.yaral")
+    
     try:
-        # Create output directory if it doesn't exist
-        output_dir = 'output'
-        os.makedirs(output_dir, exist_ok=True)
-        
-        # Generate output filename
-        base_name = os.path.splitext(os.path.basename(filename))[0]
-        output_filename = f"{base_name}_converted.yaral"
-        output_path = os.path.join(output_dir, output_filename)
-        
-        with open(output_path, 'w') as f:
-            f.write(yaral_content)
-        return True
-    except Exception as e:
-        st.error(f"Error saving YARAL rule: {str(e)}")
-        return False
+        _write_atomically(output_path, yaral_content)
+    except FileNotFoundError:
+        # Create output directory if it doesn't exist; only pays the
+        # makedirs call on the first save
+        os.makedirs(OUTPUT_DIR, exist_ok=True)
+        _write_atomically(output_path, yaral_content)
+    return output_path
+
+def _write_atomically(path: str, content: str) -> None:
+    """Write content to a temporary file next to path, then swap it into place."""
+    # os.replace is atomic, so readers never see a truncated file if the
+    # app is killed mid-write
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', buffering=1 << 16, newline='') as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+@st.cache_resource
+def get_save_executor() -> ThreadPoolExecutor:
+    # A single worker keeps saves to the same file in submission order
+    return ThreadPoolExecutor(max_workers=1, thread_name_prefix="yaral-save")
+
+def save_yaral_rule_async(yaral_content: str, filename: str) -> Future:
+    """Save the YARAL rule in the background so the result renders immediately."""
+    return get_save_executor().submit(_write_yaral_rule, yaral_content, filename)
+
+def report_save_errors() -> None:
+    """Show the error from a finished background save, if any."""
+    future = st.session_state.get("save_future")
+    if future is None or not future.done():
+        return
+    del st.session_state.save_future
+    error = future.exception()
+    if error is not None:
+        st.error(f"Error saving YARAL rule: {str(error)}")
+
+# Body of a markdown code block, after an optional language tag; the body
+# may share the fence's line, as in ```yaral rule x {}```
+_FENCED_BLOCK_RE = re.compile(r"```(?:[\w-]+(?=\s))?[ \t]*\n?(.*?)\n?[ \t]*```", re.S)
+# Opening fence (with optional language tag) and closing fence of a markdown
+# code block wrapping the whole response, for a block left unclosed
+_FENCE_RE = re.compile(r"\A\s*```[\w-]*[ \t]*(?:\n|\Z)|\n?[ \t]*```\s*\Z")
 
 def clean_yaral_content(yaral_content: str) -> str:
     """Clean the YARAL content by removing markdown code blocks and unnecessary comments."""
-    # Remove markdown code blocks if present
-    content = yaral_content.replace('```yaral', '').replace('```', '')
+    # Keep only the first code block, dropping any lead-in text around it;
+    # single backticks inside the rule are left alone
+    block = _FENCED_BLOCK_RE.search(yaral_content)
+    content = block.group(1) if block else _FENCE_RE.sub('', yaral_content)
     
     # Remove leading/trailing whitespace
-    content = content.strip()
-    
-    return content
+    return content.strip()
 
-def convert_to_yaral(client: GeminiRegionClient, rule_content: dict) -> str:
-    # Load example YARAL rules
-    yaral_examples = load_yaral_examples()
-    
-    # Create a structured prompt with mapping information and guidelines
-    mapping_reference = """
+# Parts of the conversion prompt that do not depend on the input rule.
+# They form the start of the prompt so repeated conversions share a long,
+# identical prefix that Gemini can serve from its context cache.
+CONVERSION_TASK = "Task: Convert the provided Microsoft Sentinel detection rule into a Chronicle Yara-L rule format."
+
+MAPPING_REFERENCE = """
     Common Event Type Mappings:
     - SecurityEvent (EventID 4688) → PROCESS_LAUNCH
     - SigninLogs → USER_LOGIN
@@ -168,31 +644,7 @@ def convert_to_yaral(client: GeminiRegionClient, rule_content: dict) -> str:
     - AzureActivity → CLOUD_ACTIVITY
     """
 
-    # Create examples section using ALL available YARAL examples
-    examples_text = "\n\n".join([
-        f"Example - {filename}:\n```\n{content}\n```"
-        for filename, content in yaral_examples.items()
-        if filename.endswith('.yaral')  # Include all .yaral files
-    ])
-    
-    prompt = f"""Task: Convert the provided Microsoft Sentinel detection rule into a Chronicle Yara-L rule format.
-
-Input Rule Details:
-Name: {rule_content.get('name', 'Unknown')}
-Description: {rule_content.get('description', 'No description provided')}
-Severity: {rule_content.get('severity', 'Medium')}
-MITRE Tactics: {', '.join(rule_content.get('tactics', []))}
-MITRE Techniques: {', '.join(rule_content.get('techniques', []))}
-
-Original Rule Content:
-{yaml.dump(rule_content, default_flow_style=False)}
-
-{mapping_reference}
-
-Reference Examples of Well-Formatted YARAL Rules:
-{examples_text}
-
-Output Requirements:
+OUTPUT_REQUIREMENTS = """Output Requirements:
 1. Maintain detection logic equivalence while adapting to Yara-L syntax
 2. Use appropriate Chronicle data sources and fields based on the mapping reference
 3. Preserve the rule's metadata (severity, description, tactics)
@@ -206,20 +658,124 @@ Output Requirements:
 5. Add comments explaining any complex logic translations
 6. Include appropriate time windows and error handling
 
-The author of the rule should always be "Gemini"
-Please convert this rule to Chronicle YARAL format while maintaining its detection capabilities and following the patterns shown in the example rules."""
+The author of the rule should always be "Gemini\""""
 
-    try:
-        yaral_content = client.generate_content(prompt)
-        # Clean the content before returning
-        return clean_yaral_content(yaral_content)
-    except Exception as e:
-        st.error(f"Error converting rule: {str(e)}")
-        return None
+CONVERSION_INSTRUCTION = "Please convert this rule to Chronicle YARAL format while maintaining its detection capabilities and following the patterns shown in the example rules."
+
+RULE_DETAILS_TEMPLATE = """Input Rule Details:
+Name: {name}
+Description: {description}
+Severity: {severity}
+MITRE Tactics: {tactics}
+MITRE Techniques: {techniques}
+
+Original Rule Content:
+"""
+
+EXAMPLE_TEMPLATE = "Example - {filename}:\n```\n{content}\n```"
+
+PROMPT_PREFIX_TEMPLATE = """{task}
+
+{mapping}
+
+Reference Examples of Well-Formatted YARAL Rules:
+{examples}
 
-def evaluate_yaral_rule(client: GeminiRegionClient, yaral_content: str) -> str:
-    """Evaluate a YARAL rule against best practices and production readiness criteria."""
-    prompt = f"""Task: Evaluate the provided Chronicle Yara-L rule against best practices and production readiness criteria.
+{requirements}
+
+"""
+
+# Hash of the fixed prompt text. Together with the examples fingerprint it
+# keys cached conversions, so editing the prompt stops serving conversions
+# made with the old one, without building the prompt to find out.
+CONVERSION_PROMPT_VERSION = hashlib.sha256("\0".join((
+    CONVERSION_TASK,
+    MAPPING_REFERENCE,
+    OUTPUT_REQUIREMENTS,
+    EXAMPLE_TEMPLATE,
+    PROMPT_PREFIX_TEMPLATE,
+    RULE_DETAILS_TEMPLATE,
+    CONVERSION_INSTRUCTION,
+)).encode("utf-8")).hexdigest()
+
+def build_prompt_prefix(yaral_examples: Mapping) -> str:
+    """Build the part of the conversion prompt that precedes the input rule."""
+    # Create examples section using ALL available YARAL examples
+    examples_text = "\n\n".join([
+        EXAMPLE_TEMPLATE.format(filename=filename, content=content)
+        for filename, content in yaral_examples.items()
+        if filename.endswith('.yaral')  # Include all .yaral files
+    ])
+    
+    return PROMPT_PREFIX_TEMPLATE.format(
+        task=CONVERSION_TASK,
+        mapping=MAPPING_REFERENCE,
+        examples=examples_text,
+        requirements=OUTPUT_REQUIREMENTS,
+    )
+
+@st.cache_resource(show_spinner=False, max_entries=1)
+def get_prompt_prefix(fingerprint: str) -> str:
+    """Return the conversion prompt prefix for the examples matching fingerprint."""
+    # Shared by every session and rebuilt only when the examples change
+    return build_prompt_prefix(LazyExamples(_load_examples(fingerprint)[0]))
+
+def build_conversion_prompt(rule_content: dict, prompt_prefix: str, rule_yaml: Optional[str] = None) -> str:
+    # Only the rule details change between calls; the task, mapping
+    # reference, examples and output requirements come from the prefix
+    rule_details = RULE_DETAILS_TEMPLATE.format(
+        name=rule_content.get('name', 'Unknown'),
+        description=rule_content.get('description', 'No description provided'),
+        severity=rule_content.get('severity', 'Medium'),
+        tactics=', '.join(rule_content.get('tactics', [])),
+        techniques=', '.join(rule_content.get('techniques', [])),
+    )
+    if rule_yaml is None:
+        rule_yaml = yaml.dump(rule_content, Dumper=SafeDumper, default_flow_style=False)
+    # Single join so the multi-KB prefix is copied once
+    return "".join((prompt_prefix, rule_details, rule_yaml, "\n", CONVERSION_INSTRUCTION))
+
+def conversion_cache_key(client: GeminiRegionClient, rule_yaml: str, examples_version: str) -> str:
+    """Key a conversion by the rule, the prompt and examples, and the model settings."""
+    # The dumped YAML stands in for the parsed rule, whose keys need not be
+    # strings and so cannot always be serialised to JSON
+    return LLMCache.make_key(
+        model=client.model_name,
+        generation_config=client.default_generation_config.to_dict(),
+        rule=rule_yaml,
+        prompt=CONVERSION_PROMPT_VERSION,
+        examples=examples_version,
+    )
+
+def convert_to_yaral_stream(client: GeminiRegionClient, rule_content: dict, prompt_prefix: str,
+                            rule_yaml: Optional[str] = None) -> Iterator[str]:
+    """Stream the raw YARAL conversion; clean the joined text with clean_yaral_content."""
+    return client.generate_content_stream(build_conversion_prompt(rule_content, prompt_prefix, rule_yaml))
+
+def convert_rule(client: GeminiRegionClient, rule_content: dict, examples_version: str,
+                 rule_yaml: Optional[str] = None) -> Tuple[Optional[str], bool]:
+    """Convert a rule, streaming the output, unless an identical conversion is cached.
+
+    Returns the cleaned YARAL rule and whether it came from the cache.
+    """
+    if rule_yaml is None:
+        rule_yaml = yaml.dump(rule_content, Dumper=SafeDumper, default_flow_style=False)
+    # Look up the cache before reading the examples or rendering the prompt
+    cache_key = conversion_cache_key(client, rule_yaml, examples_version)
+    cached = conversion_cache.get(cache_key)
+    if cached is not None:
+        return cached, True
+
+    # Stream the output so the first tokens show up right away
+    yaral_rule = clean_yaral_content(write_stream_preview(convert_to_yaral_stream(
+        client, rule_content, get_prompt_prefix(examples_version), rule_yaml
+    )))
+    if yaral_rule:
+        conversion_cache.set(cache_key, yaral_rule)
+    return yaral_rule, False
+
+def build_evaluation_prompt(yaral_content: str) -> str:
+    return f"""Task: Evaluate the provided Chronicle Yara-L rule against best practices and production readiness criteria.
 
 Input YARAL Rule:
 ```yaral
@@ -313,13 +869,121 @@ Implementation Recommendations:
 Final Recommendations:
 [Summary of key actions needed for production deployment]"""
 
+def evaluate_yaral_rule_stream(client: GeminiRegionClient, yaral_content: str) -> Iterator[str]:
+    """Stream the evaluation of a YARAL rule as it is generated."""
+    return client.generate_content_stream(build_evaluation_prompt(yaral_content))
+
+@st.cache_resource
+def get_eval_executor() -> ThreadPoolExecutor:
+    """Process-wide pool for speculative evaluations, shared by every session."""
+    return ThreadPoolExecutor(max_workers=4, thread_name_prefix="yaral-eval")
+
+def evaluation_key(client: GeminiRegionClient, yaral_content: str) -> Tuple[str, str, dict]:
+    """Identify an evaluation by the rule and the model settings it runs with."""
+    return yaral_content, client.model_name, client.default_generation_config.to_dict()
+
+def _evaluate_in_background(client: GeminiRegionClient, prompt: str, model_name: str,
+                            generation_config: GenerationConfig) -> str:
+    # Streamed so the hedge delay only covers the wait for the first chunk;
+    # a long report would otherwise start a second billed request
+    return "".join(client.generate_content_stream(
+        prompt, model_name=model_name, generation_config=generation_config
+    ))
+
+def evaluate_yaral_rule_async(client: GeminiRegionClient, yaral_content: str) -> Future:
+    """Start evaluating a freshly converted rule before the user asks for it.
+
+    Errors stay in the future instead of being shown, since Streamlit calls
+    cannot be made from the worker thread.
+    """
+    # Pin the current model and settings; the sidebar may change them on
+    # the session's client while the evaluation runs
+    return get_eval_executor().submit(
+        _evaluate_in_background,
+        client,
+        build_evaluation_prompt(yaral_content),
+        client.model_name,
+        client.default_generation_config,
+    )
+
+def start_speculative_evaluation(client: GeminiRegionClient, yaral_content: str) -> None:
+    """Evaluate a converted rule in the background unless that was already done."""
+    key = evaluation_key(client, yaral_content)
+    if st.session_state.get("evaluation_key") == key:
+        return
+    future = st.session_state.get("eval_future")
+    if future is not None:
+        if st.session_state.get("eval_future_key") == key and not future.cancelled():
+            return
+        # An evaluation of an older rule or settings would only hold up the shared pool
+        future.cancel()
+    st.session_state.eval_future = evaluate_yaral_rule_async(client, yaral_content)
+    st.session_state.eval_future_key = key
+
+def take_speculative_evaluation(client: GeminiRegionClient, yaral_content: str) -> Optional[str]:
+    """Return the background evaluation of this rule, or None if unusable.
+
+    The evaluation is discarded if the model or its settings changed since
+    it started. One still in flight is waited on, which is sooner than
+    starting a new one.
+    """
+    future = st.session_state.pop("eval_future", None)
+    future_key = st.session_state.pop("eval_future_key", None)
+    if future is None:
+        return None
+    if future_key != evaluation_key(client, yaral_content):
+        future.cancel()
+        return None
     try:
-        evaluation = client.generate_content(prompt)
-        return evaluation
+        return future.result()
     except Exception as e:
-        st.error(f"Error evaluating rule: {str(e)}")
+        _LOGGER.warning("Speculative evaluation failed: %s", e)
         return None
 
+def write_stream_preview(chunks: Iterator[str]) -> str:
+    """Show streamed text while it arrives and return it once complete.
+
+    The preview is cleared afterwards so the caller can render the final
+    result in its usual place.
+    """
+    placeholder = st.empty()
+    try:
+        with placeholder.container():
+            text = st.write_stream(chunks)
+    finally:
+        placeholder.empty()
+    return text if isinstance(text, str) else "".join(text)
+
+@st.cache_resource
+def get_model_cache() -> RegionModelCache:
+    """Process-wide model cache shared by every session's client."""
+    return RegionModelCache()
+
+@st.cache_resource
+def get_region_health() -> RegionHealth:
+    """Process-wide region latency and failure state, so new sessions start informed."""
+    return RegionHealth()
+
+# Example YARAL rules shown in the Example Rules tab: rule1.yaral to rule5.yaral
+_RULE_RE = re.compile(r"^rule([1-5])\.yaral$")
+
+@st.cache_data(show_spinner=False)
+def filter_rule_files(filenames: Tuple[str, ...]) -> Tuple[str, ...]:
+    """Return the sorted example rule files to list in the Example Rules tab."""
+    return tuple(sorted(name for name in filenames if _RULE_RE.match(name)))
+
+def get_client(project_id: str) -> GeminiRegionClient:
+    """Return this session's GeminiRegionClient, creating it on first use."""
+    # Kept per session rather than in st.cache_resource because the model
+    # and generation settings on the client come from this session's sidebar
+    if st.session_state.get("client_project_id") != project_id:
+        st.session_state.client = GeminiRegionClient(
+            project_id=project_id, model_cache=get_model_cache(), region_health=get_region_health()
+        )
+        st.session_state.client_project_id = project_id
+        st.session_state.pop("llm_settings", None)
+    return st.session_state.client
+
 def setup_sidebar():
     """Configure the sidebar with app explanation and LLM settings."""
     st.sidebar.title("About")
@@ -336,14 +1000,9 @@ def setup_sidebar():
     
     # Create sliders using configuration
     controls = {}
-    for name, config in LLM_CONTROL_CONFIGS.items():
+    for name, label, min_value, max_value, default_value, step, help_text in SLIDER_SPECS:
         controls[name] = st.sidebar.slider(
-            name.replace('_', ' ').title(),
-            min_value=config["min_value"],
-            max_value=config["max_value"],
-            value=config["default_value"],
-            step=config["step"],
-            help=config["help"]
+            label, min_value, max_value, default_value, step, help=help_text
         )
     
     return {
@@ -351,9 +1010,14 @@ def setup_sidebar():
         **controls
     }
 
+@st.cache_resource
+def load_env() -> bool:
+    """Load environment variables from the .env file once per process."""
+    return load_dotenv()
+
 def main():
     # Load environment variables from .env file
-    load_dotenv()
+    load_env()
     
     st.set_page_config(page_title="Sentinel to YARAL Converter", layout="wide")
     
@@ -372,19 +1036,22 @@ def main():
             return
         os.environ["GCP_PROJECT"] = project_id
     
-    client = GeminiRegionClient()
+    client = get_client(project_id)
     
-    # Configure the model based on sidebar settings
-    client.set_model(llm_config["model_name"])
-    client.update_generation_config(
-        temperature=llm_config["temperature"],
-        max_output_tokens=llm_config["max_tokens"],
-        top_p=llm_config["top_p"]
-    )
+    # Configure the model based on sidebar settings, only when they changed
+    llm_settings = (llm_config["model_name"], llm_config["temperature"],
+                    llm_config["max_tokens"], llm_config["top_p"])
+    if st.session_state.get("llm_settings") != llm_settings:
+        client.set_model(llm_config["model_name"])
+        client.update_generation_config(
+            temperature=llm_config["temperature"],
+            max_output_tokens=llm_config["max_tokens"],
+            top_p=llm_config["top_p"]
+        )
+        st.session_state.llm_settings = llm_settings
     
     # Load example rules
-    example_rules = load_example_rules()
-    yaral_examples = load_yaral_examples()
+    examples_version, yaral_examples, example_rules = load_all_examples()
     
     with tab1:
         st.title("Sentinel to YARAL Rule Converter")
@@ -396,14 +1063,24 @@ def main():
             
             if input_method == "Use Example":
                 selected_example = st.selectbox("Select an example rule:", list(example_rules.keys()))
-                rule_content = example_rules[selected_example]
-                st.code(yaml.dump(rule_content, default_flow_style=False), language="yaml")
+                rule_content, rule_yaml = example_rules[selected_example]
+                st.code(rule_yaml, language="yaml")
             else:
+                rule_yaml = None
                 uploaded_file = st.file_uploader("Upload a Sentinel rule YAML file", type="yaml")
                 if uploaded_file:
                     try:
-                        rule_content = yaml.safe_load(uploaded_file)
-                        st.code(yaml.dump(rule_content, default_flow_style=False), language="yaml")
+                        # Parsing is cached by content, and the original text
+                        # is shown rather than re-dumping the parsed rule
+                        uploaded_bytes = uploaded_file.getvalue()
+                        rule_content, rule_yaml = parse_uploaded_rule(uploaded_bytes)
+                        try:
+                            uploaded_text = uploaded_bytes.decode("utf-8")
+                        except UnicodeDecodeError:
+                            # YAML files may also be UTF-16, which the parser
+                            # accepts; show the dumped rule for those
+                            uploaded_text = rule_yaml
+                        st.code(uploaded_text, language="yaml")
                     except yaml.YAMLError as e:
                         st.error(f"Error loading YAML file: {str(e)}")
                         rule_content = None
@@ -416,13 +1093,27 @@ def main():
             if st.button("Convert to YARAL"):
                 if rule_content:
                     with st.spinner("Converting rule..."):
-                        yaral_rule = convert_to_yaral(client, rule_content)
+                        try:
+                            yaral_rule, from_cache = convert_rule(
+                                client, rule_content, examples_version, rule_yaml
+                            )
+                        except Exception as e:
+                            st.error(f"Error converting rule: {str(e)}")
+                            yaral_rule, from_cache = None, False
+                        if from_cache:
+                            st.info("Reused the previous conversion of this rule with the same model settings.")
                         if yaral_rule:
                             st.session_state.yaral_rule = yaral_rule
-                            # Save the YARAL rule to output directory
-                            if save_yaral_rule(yaral_rule, 
-                                             selected_example if input_method == "Use Example" else "uploaded_rule"):
-                                st.success("Rule converted and saved to output directory!")
+                            # Save the YARAL rule to output directory without blocking the UI
+                            st.session_state.save_future = save_yaral_rule_async(
+                                yaral_rule,
+                                selected_example if input_method == "Use Example" else "uploaded_rule"
+                            )
+                            # Evaluate in the background so the result is ready when asked for
+                            start_speculative_evaluation(client, yaral_rule)
+                            st.success("Rule converted! Saving it to the output directory in the background.")
+            
+            report_save_errors()
         
         with col2:
             st.header("Output")
@@ -446,9 +1137,18 @@ def main():
                 # Add evaluation button
                 if st.button("Evaluate Rule"):
                     with st.spinner("Evaluating rule..."):
-                        evaluation_result = evaluate_yaral_rule(client, st.session_state.yaral_rule)
+                        evaluation_result = take_speculative_evaluation(client, st.session_state.yaral_rule)
+                        if evaluation_result is None:
+                            try:
+                                evaluation_result = write_stream_preview(
+                                    evaluate_yaral_rule_stream(client, st.session_state.yaral_rule)
+                                )
+                            except Exception as e:
+                                st.error(f"Error evaluating rule: {str(e)}")
+                                evaluation_result = None
                         if evaluation_result:
                             st.session_state.evaluation_result = evaluation_result
+                            st.session_state.evaluation_key = evaluation_key(client, st.session_state.yaral_rule)
                             st.success("Rule evaluation completed!")
 
                 # Display evaluation results if available
@@ -459,23 +1159,23 @@ def main():
     with tab2:
         st.title("Example YARAL Rules")
         # Filter only rule1 to rule5 yaral files
-        rule_files = {k: v for k, v in yaral_examples.items() 
-                     if k.startswith('rule') and k.endswith('.yaral') 
-                     and k[4:-6].isdigit() and 1 <= int(k[4:-6]) <= 5}
+        rule_files = filter_rule_files(tuple(yaral_examples))
         
         selected_rule = st.selectbox(
             "Select an example YARAL rule to view:",
-            options=sorted(rule_files.keys()),
+            options=rule_files,
             key="example_rule_selector"
         )
         
         if selected_rule:
-            st.code(rule_files[selected_rule], language="python")
+            # Only the selected example is read from disk
+            rule_text = yaral_examples[selected_rule]
+            st.code(rule_text, language="python")
             
             # Add download button for the example
             st.download_button(
                 label=f"Download {selected_rule}",
-                data=rule_files[selected_rule],
+                data=rule_text,
                 file_name=selected_rule,
                 mime="text/plain"
             )
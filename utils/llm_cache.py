@@ -0,0 +1,107 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+class LLMCache:
+    """Content-addressed cache of LLM responses.
+
+    Responses are kept in an in-process LRU and written through to files
+    on disk, so they also survive app restarts. Beyond max_disk_entries the
+    least recently used files are deleted.
+    """
+
+    def __init__(self, cache_dir: str = os.path.join("output", ".llm_cache"), max_entries: int = 128,
+                 suffix: str = ".txt", max_disk_entries: int = 1024):
+        self.cache_dir = cache_dir
+        self.suffix = suffix
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self.logger = logging.getLogger(__name__)
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(**parts) -> str:
+        """Hash the JSON-canonicalised request parts into a cache key."""
+        payload = json.dumps(parts, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}{self.suffix}")
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding="utf-8") as f:
+                value = f.read()
+            # Mark the file as recently used so pruning keeps it
+            os.utime(path)
+        except OSError:
+            return None
+        self._remember(key, value)
+        return value
+
+    def set(self, key: str, value: str) -> None:
+        # An empty answer is a failed call, never worth replaying
+        if not value:
+            return
+        self._remember(key, value)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = f"{self._path(key)}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'w', encoding="utf-8") as f:
+                f.write(value)
+            os.replace(tmp_path, self._path(key))
+        except OSError as e:
+            self.logger.warning("Could not write LLM cache entry %s: %s", key, e)
+            return
+        self._prune_disk()
+
+    def _prune_disk(self) -> None:
+        """Delete the least recently used files beyond max_disk_entries."""
+        # Runs once per write, which follows a model call that takes seconds
+        try:
+            with os.scandir(self.cache_dir) as it:
+                entries = [entry for entry in it if entry.name.endswith(self.suffix)]
+            if len(entries) <= self.max_disk_entries:
+                return
+            entries.sort(key=lambda entry: entry.stat().st_mtime_ns)
+            for entry in entries[:len(entries) - self.max_disk_entries]:
+                os.remove(entry.path)
+        except OSError as e:
+            self.logger.warning("Could not prune LLM cache %s: %s", self.cache_dir, e)
+
+    def _remember(self, key: str, value: str) -> None:
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+llm_cache = LLMCache()
+
+# Converted YARAL rules keyed by the input rule and model settings rather
+# than the full prompt, so a hit can skip building the prompt entirely
+conversion_cache = LLMCache(os.path.join("output", ".conv_cache"), suffix=".yaral")